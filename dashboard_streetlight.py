@@ -1,18 +1,161 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import json
+import csv
+import io
 import time
 import paho.mqtt.client as mqtt
 from datetime import datetime, timedelta
 import plotly.graph_objects as go
 import plotly.express as px
 import socket
+import queue
+import threading
+import uuid
+import weakref
 
 # ==================== KONFIGURASI MQTT ====================
 MQTT_BROKER = "broker.hivemq.com"
 MQTT_PORT = 1883
 MQTT_TOPIC_SENSOR = "iot/streetlight"
 MQTT_TOPIC_CONTROL = "iot/streetlight/control"
+MQTT_LOG_INTERVAL = 5  # Detik minimum antar print log paho
+MQTT_DEBUG = False  # Print setiap pesan yang diterima/diparse
+MAX_LOGS = 1000
+MQTT_INBOX_SIZE = 2048  # Maksimum baris yang menunggu diambil script
+LIVE_REFRESH_FLOWING = "1s"  # Interval fragment live saat data mengalir
+LIVE_REFRESH_IDLE = "5s"     # Interval saat tidak ada data masuk
+LIVE_IDLE_AFTER = 10         # Detik tanpa data sebelum dianggap idle
+
+# Tegangan relay -> (relay_state, lamp_state) sesuai logika ESP32
+VOLTAGE_STATES = {
+    0.0: ("MATI", "MENYALA"),
+    220.0: ("AKTIF", "MATI")
+}
+UNKNOWN_STATES = ("UNKNOWN", "UNKNOWN")
+
+# ==================== TEMPLATE HTML ====================
+CUSTOM_CSS = """
+<style>
+    /* Custom styling */
+    div[data-testid="stMetricValue"] {
+        font-size: 24px;
+        font-weight: bold;
+    }
+    
+    div[data-testid="stMetricDelta"] {
+        font-size: 14px;
+    }
+    
+    .stButton button {
+        transition: all 0.3s ease;
+    }
+    
+    .stButton button:hover {
+        transform: translateY(-1px);
+        box-shadow: 0 3px 6px rgba(0,0,0,0.1);
+    }
+</style>
+"""
+
+FOOTER_TMPL = """
+<div style="text-align: right; color: #666; font-size: 12px; padding: 10px;">
+    <p>💡 <strong>Smart Streetlight Dashboard</strong> | 
+    Status: {status_icon} {connection_status} | 
+    Data: {data_count} records | 
+    Update: {update_time}</p>
+</div>
+"""
+
+# Kartu status dirender dalam satu st.markdown; caption ikut di dalam HTML
+CARDS_ROW_TMPL = """<div style="display: grid; grid-template-columns: repeat(3, 1fr); gap: 1rem;">
+{cards}
+</div>"""
+
+RELAY_CARD_TMPL = """<div>
+<div style="background-color: {bg_color}; padding: 15px; border-radius: 10px; color: white; text-align: center;">
+<div style="font-size: 14px; opacity: 0.9;">{icon} Status Relay</div>
+<div style="font-size: 24px; font-weight: bold; margin: 5px 0;">{relay_state}</div>
+<div style="font-size: 16px;">{voltage} V</div>
+</div>
+<div style="font-size: 14px; opacity: 0.6; margin-top: 4px;">{caption}</div>
+</div>"""
+
+LAMP_CARD_TMPL = """<div>
+<div style="background-color: {bg_color}; padding: 15px; border-radius: 10px; color: {text_color}; text-align: center;">
+<div style="font-size: 14px; opacity: 0.9;">Status Lampu</div>
+<div style="font-size: 36px; margin: 10px 0;">{icon}</div>
+<div style="font-size: 20px; font-weight: bold;">{lamp_state}</div>
+</div>
+<div style="font-size: 14px; opacity: 0.6; margin-top: 4px;">{caption}</div>
+</div>"""
+
+INFO_CARD_TMPL = """<div>
+<div style="background-color: #0d6efd; padding: 15px; border-radius: 10px; color: white; text-align: center;">
+<div style="font-size: 14px; opacity: 0.9;">📊 Info Sistem</div>
+<div style="font-size: 20px; font-weight: bold; margin: 5px 0;">{time_str}</div>
+<div style="font-size: 12px;">{date_str}</div>
+<div style="font-size: 12px; margin-top: 5px;">Data: {data_count} records</div>
+</div>
+<div style="font-size: 14px; opacity: 0.6; margin-top: 4px;">Update terakhir</div>
+</div>"""
+
+# ==================== BUFFER DATA ====================
+# Status relay/lampu disimpan sebagai kode int8; label di-decode lewat indeks
+# (kode -1 mengambil elemen terakhir, "UNKNOWN")
+RELAY_CODES = {"MATI": 0, "AKTIF": 1, "UNKNOWN": -1}
+LAMP_CODES = {"MATI": 0, "MENYALA": 1, "UNKNOWN": -1}
+LAMP_ON_CODE = LAMP_CODES["MENYALA"]
+RELAY_LABELS = np.array(["MATI", "AKTIF", "UNKNOWN"])
+LAMP_LABELS = np.array(["MATI", "MENYALA", "UNKNOWN"])
+
+class LogBuffer:
+    """Ring buffer struct-of-arrays untuk riwayat data sensor"""
+
+    def __init__(self, capacity=MAX_LOGS):
+        self.capacity = capacity
+        self.timestamp = np.empty(capacity, dtype="datetime64[ns]")
+        self.intensity = np.empty(capacity, dtype=np.float32)
+        self.voltage = np.empty(capacity, dtype=np.float32)
+        self.relay = np.empty(capacity, dtype=np.int8)
+        self.lamp = np.empty(capacity, dtype=np.int8)
+        self.head = 0    # Posisi tulis berikutnya
+        self.count = 0
+        self.token = uuid.uuid4().hex    # Kunci cache unik per buffer/sesi
+
+    def __len__(self):
+        return self.count
+
+    def extend(self, rows):
+        """Write a batch of rows with one array assignment per column"""
+        rows = rows[-self.capacity:]
+        n = len(rows)
+        if not n:
+            return
+        idx = (self.head + np.arange(n)) % self.capacity
+        self.timestamp[idx] = [row["timestamp"] for row in rows]
+        # None menjadi NaN pada array float
+        self.intensity[idx] = np.array([row["intensity"] for row in rows], dtype=np.float32)
+        self.voltage[idx] = np.array([row["voltage"] for row in rows], dtype=np.float32)
+        self.relay[idx] = [RELAY_CODES.get(row["relay_state"], -1) for row in rows]
+        self.lamp[idx] = [LAMP_CODES.get(row["lamp_state"], -1) for row in rows]
+        self.head = (self.head + n) % self.capacity
+        self.count = min(self.count + n, self.capacity)
+
+    def tail(self, n):
+        """Return the last n rows as a dict of arrays in chronological order"""
+        n = min(n, self.count)
+        start = (self.head - n) % self.capacity
+        end = start + n
+        columns = {}
+        for name in ("timestamp", "intensity", "voltage", "relay", "lamp"):
+            arr = getattr(self, name)
+            if end <= self.capacity:
+                columns[name] = arr[start:end]
+            else:
+                columns[name] = np.concatenate((arr[start:], arr[:end - self.capacity]))
+        return columns
 
 # ==================== SESSION STATE INIT ====================
 if "mqtt_connected" not in st.session_state:
@@ -25,13 +168,22 @@ if "connection_error" not in st.session_state:
     st.session_state.connection_error = ""
 
 if "logs" not in st.session_state:
-    st.session_state.logs = []
+    st.session_state.logs = LogBuffer()
 
 if "last_data" not in st.session_state:
     st.session_state.last_data = None
 
-if "mqtt_client" not in st.session_state:
-    st.session_state.mqtt_client = None
+if "trend_fig" not in st.session_state:
+    st.session_state.trend_fig = None
+
+if "gauge_fig" not in st.session_state:
+    st.session_state.gauge_fig = None
+
+if "data_version" not in st.session_state:
+    st.session_state.data_version = 0
+
+if "mqtt_inbox" not in st.session_state:
+    st.session_state.mqtt_inbox = None
 
 if "broker_test_result" not in st.session_state:
     st.session_state.broker_test_result = None
@@ -39,30 +191,183 @@ if "broker_test_result" not in st.session_state:
 if "last_connection_attempt" not in st.session_state:
     st.session_state.last_connection_attempt = "Belum pernah"
 
+if "last_row_time" not in st.session_state:
+    st.session_state.last_row_time = 0.0
+
+if "data_flowing" not in st.session_state:
+    st.session_state.data_flowing = False
+
+if "stats_memo" not in st.session_state:
+    st.session_state.stats_memo = None
+
+if "history_memo" not in st.session_state:
+    st.session_state.history_memo = None
+
+if "csv_memo" not in st.session_state:
+    st.session_state.csv_memo = None
+
 # ==================== FUNGSI TEST KONEKSI ====================
+@st.cache_data(ttl=30, show_spinner=False)
 def test_broker_connection():
-    """Test connection to MQTT broker"""
+    """Test connection to MQTT broker (result cached for 30 seconds)"""
     try:
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(5)
+        sock.settimeout(1.0)
         result = sock.connect_ex((MQTT_BROKER, MQTT_PORT))
         sock.close()
         return result == 0, None
     except Exception as e:
         return False, str(e)
 
+# ==================== MQTT INBOX ====================
+class MqttInbox:
+    """Buffer thread-safe antara callback MQTT dan sesi Streamlit"""
+    # Callback berjalan di thread loop_start() dan tidak bisa mengakses
+    # st.session_state; script mengambil isinya lewat process_inbox().
+    # Baris data dibatasi MQTT_INBOX_SIZE (yang tertua dibuang saat penuh),
+    # status koneksi diantre terpisah agar tidak ikut terbuang.
+
+    def __init__(self):
+        self.rows = queue.Queue(maxsize=MQTT_INBOX_SIZE)
+        self.status = queue.SimpleQueue()
+
+    def put_row(self, row):
+        try:
+            self.rows.put_nowait(row)
+        except queue.Full:
+            try:
+                self.rows.get_nowait()
+            except queue.Empty:
+                pass
+            self.rows.put_nowait(row)
+
+    def set_status(self, connected, status, error=None):
+        self.status.put((connected, status, error))
+
+    def drain(self):
+        rows = []
+        status = None
+        try:
+            while True:
+                rows.append(self.rows.get_nowait())
+        except queue.Empty:
+            pass
+        try:
+            while True:
+                status = self.status.get_nowait()
+        except queue.Empty:
+            pass
+        return rows, status
+
+class MqttHub:
+    """Satu client MQTT bersama yang membagikan data ke inbox setiap sesi"""
+    # Hanya ada satu thread loop_start() per proses, bukan satu per sesi.
+    # Inbox dipegang lewat weakref: sesi yang ditutup/di-reload tanpa
+    # "Putuskan Koneksi" terlepas sendiri saat session_state-nya dibuang,
+    # dan client dihentikan saat sesi terakhir memutus koneksi atau pada
+    # pesan pertama yang tiba ketika tidak ada inbox tersisa.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.inboxes = weakref.WeakSet()
+        self.client = None
+        self.status = None
+        self.last_log = 0.0
+
+    def subscribers(self):
+        with self.lock:
+            return list(self.inboxes)
+
+    def attach(self, inbox):
+        with self.lock:
+            self.inboxes.add(inbox)
+            if self.client is not None:
+                # Client sudah berjalan: kirim status terakhir ke sesi baru
+                if self.status is not None:
+                    inbox.set_status(*self.status)
+                return
+            try:
+                self._start()
+            except Exception:
+                self.client = None
+                self.inboxes.discard(inbox)
+                raise
+
+    def detach(self, inbox):
+        with self.lock:
+            self.inboxes.discard(inbox)
+        self.stop_if_idle()
+
+    def _start(self):
+        client = mqtt.Client(
+            client_id=f"streetlight-{uuid.uuid4().hex[:8]}",
+            clean_session=True,
+            userdata=self
+        )
+        client.on_connect = on_connect
+        client.on_message = on_message
+        client.on_disconnect = on_disconnect
+        client.on_log = on_log
+        client.reconnect_delay_set(min_delay=1, max_delay=30)
+        
+        # Diset sebelum loop_start() agar on_connect pertama tidak diabaikan
+        self.client = client
+        self.status = None
+        
+        # Connect
+        client.connect(MQTT_BROKER, MQTT_PORT, 60)
+        client.loop_start()  # Thread jaringan paho memproses pesan saat tiba
+
+    def stop_if_idle(self):
+        with self.lock:
+            if len(self.inboxes):
+                return
+            client, self.client = self.client, None
+            self.status = None
+        if client is not None:
+            try:
+                client.disconnect()
+                client.loop_stop()  # Aman juga bila dipanggil dari thread paho
+            except:
+                pass
+
+    def set_status(self, client, connected, status, error=None):
+        # Abaikan callback dari client lama yang sudah dihentikan
+        if client is not self.client:
+            return
+        self.status = (connected, status, error)
+        for inbox in self.subscribers():
+            inbox.set_status(connected, status, error)
+
+    def put_row(self, row):
+        inboxes = self.subscribers()
+        if not inboxes:
+            # Semua sesi sudah pergi; hentikan client dari thread-nya sendiri
+            self.stop_if_idle()
+            return
+        for inbox in inboxes:
+            inbox.put_row(row)
+
+@st.cache_resource(show_spinner=False)
+def get_mqtt_hub():
+    """Shared MQTT hub for all sessions of this server process"""
+    return MqttHub()
+
 # ==================== MQTT CALLBACKS ====================
 def on_connect(client, userdata, flags, rc, properties=None):
     """Callback ketika koneksi MQTT berhasil/gagal"""
     if rc == 0:
-        st.session_state.mqtt_connected = True
-        st.session_state.connection_status = "✅ TERKONEKSI"
-        st.session_state.connection_error = ""
+        # Matikan Nagle agar paket MQTT kecil tidak ditahan; diset di sini
+        # supaya berlaku juga untuk socket baru setelah auto-reconnect
+        try:
+            client.socket().setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except Exception as e:
+            print(f"⚠️ TCP_NODELAY not set: {e}")
         client.subscribe(MQTT_TOPIC_SENSOR)
+        userdata.set_status(client, True, "✅ TERKONEKSI", "")
         print(f"✅ Connected to MQTT broker")
         print(f"✅ Subscribed to topic: {MQTT_TOPIC_SENSOR}")
     else:
-        st.session_state.mqtt_connected = False
         error_messages = {
             1: "Incorrect protocol version",
             2: "Invalid client identifier",
@@ -71,59 +376,67 @@ def on_connect(client, userdata, flags, rc, properties=None):
             5: "Not authorized"
         }
         error_msg = error_messages.get(rc, f"Error code: {rc}")
-        st.session_state.connection_status = f"❌ {error_msg}"
-        st.session_state.connection_error = error_msg
+        userdata.set_status(client, False, f"❌ {error_msg}", error_msg)
         print(f"❌ Connection failed: {error_msg}")
 
 def on_disconnect(client, userdata, rc):
     """Callback ketika terputus dari MQTT"""
-    st.session_state.mqtt_connected = False
-    st.session_state.connection_status = "❌ TERPUTUS"
+    userdata.set_status(client, False, "❌ TERPUTUS")
     print(f"⚠️ Disconnected from MQTT broker")
 
+def parse_timestamp(ts):
+    """Parse a fixed-layout b"YYYY-MM-DD HH:MM:SS" timestamp without strptime"""
+    if len(ts) != 19:
+        raise ValueError(f"Invalid timestamp: {ts!r}")
+    return datetime(int(ts[0:4]), int(ts[5:7]), int(ts[8:10]),
+                    int(ts[11:13]), int(ts[14:16]), int(ts[17:19]))
+
+def on_log(client, userdata, level, buf):
+    """Callback log paho, hanya warning/error dan dibatasi per MQTT_LOG_INTERVAL"""
+    if level not in (mqtt.MQTT_LOG_WARNING, mqtt.MQTT_LOG_ERR):
+        return
+    now = time.monotonic()
+    if now - userdata.last_log >= MQTT_LOG_INTERVAL:
+        userdata.last_log = now
+        print(f"⚠️ MQTT log: {buf}")
+
 def on_message(client, userdata, msg):
     """Callback ketika menerima pesan MQTT"""
     try:
-        payload = msg.payload.decode('utf-8', errors='ignore')
-        print(f"📥 Received MQTT message: {payload}")
+        payload = msg.payload
+        if MQTT_DEBUG:
+            print(f"📥 Received MQTT message: {payload}")
         
         # Parse data dari ESP32 (format: {timestamp;intensity;voltage})
-        if payload.startswith("{") and payload.endswith("}"):
-            clean_payload = payload[1:-1]  # Remove curly braces
-            parts = clean_payload.split(";")
+        # Payload ASCII diparse langsung sebagai bytes, tanpa decode UTF-8
+        if payload[:1] == b"{" and payload[-1:] == b"}":
+            parts = payload[1:-1].split(b";")
             
             if len(parts) == 3:
-                timestamp_str = parts[0].strip()
-                intensity_str = parts[1].strip()
-                voltage_str = parts[2].strip()
-                
-                # Parse values
+                # float() menerima bytes dan mengabaikan spasi di tepi
                 try:
-                    intensity = float(intensity_str)
+                    intensity = float(parts[1])
                 except:
                     intensity = None
                 
                 try:
-                    voltage = float(voltage_str)
+                    voltage = float(parts[2])
                 except:
                     voltage = None
                 
-                # Parse timestamp
+                # Parse timestamp; string tampilan disimpan sekali di sini
                 try:
-                    timestamp = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S")
+                    ts = parts[0].strip()
+                    timestamp = parse_timestamp(ts)
+                    time_str = ts[11:19].decode("ascii")
+                    date_str = ts[0:10].decode("ascii")
                 except:
                     timestamp = datetime.now()
+                    time_str = timestamp.strftime("%H:%M:%S")
+                    date_str = timestamp.strftime("%Y-%m-%d")
                 
                 # Determine states berdasarkan logika ESP32
-                if voltage == 0.0:
-                    relay_state = "MATI"
-                    lamp_state = "MENYALA"
-                elif voltage == 220.0:
-                    relay_state = "AKTIF"
-                    lamp_state = "MATI"
-                else:
-                    relay_state = "UNKNOWN"
-                    lamp_state = "UNKNOWN"
+                relay_state, lamp_state = VOLTAGE_STATES.get(voltage, UNKNOWN_STATES)
                 
                 # Create data row
                 row = {
@@ -132,25 +445,28 @@ def on_message(client, userdata, msg):
                     "voltage": voltage,
                     "relay_state": relay_state,
                     "lamp_state": lamp_state,
-                    "source": "MQTT REAL"
+                    "_time_str": time_str,
+                    "_date_str": date_str
                 }
                 
-                # Update session state
-                st.session_state.last_data = row
-                st.session_state.logs.append(row)
-                
-                # Keep logs bounded
-                if len(st.session_state.logs) > 1000:
-                    st.session_state.logs = st.session_state.logs[-1000:]
+                # Bagikan ke semua sesi yang terhubung
+                userdata.put_row(row)
                 
-                print(f"✅ Parsed: Intensity={intensity}, Voltage={voltage}, Relay={relay_state}")
+                if MQTT_DEBUG:
+                    print(f"✅ Parsed: Intensity={intensity}, Voltage={voltage}, Relay={relay_state}")
                 
     except Exception as e:
         print(f"❌ Error processing MQTT message: {e}")
 
 # ==================== FUNGSI KONEKSI MQTT ====================
 def connect_mqtt():
-    """Connect to MQTT broker"""
+    """Connect this session to the shared MQTT client"""
+    # Hindari dua inbox yang sama-sama mengisi sesi ini
+    if st.session_state.mqtt_inbox:
+        if st.session_state.mqtt_connected:
+            return True
+        disconnect_mqtt()
+    
     try:
         # Test broker connection first
         success, error = test_broker_connection()
@@ -159,15 +475,10 @@ def connect_mqtt():
             st.session_state.connection_error = error
             return False
         
-        # Create MQTT client
-        client = mqtt.Client()
-        client.on_connect = on_connect
-        client.on_message = on_message
-        client.on_disconnect = on_disconnect
-        
-        # Connect
-        client.connect(MQTT_BROKER, MQTT_PORT, 60)
-        st.session_state.mqtt_client = client
+        # Daftarkan inbox sesi ini; client dibuat bila belum berjalan
+        inbox = MqttInbox()
+        get_mqtt_hub().attach(inbox)
+        st.session_state.mqtt_inbox = inbox
         st.session_state.last_connection_attempt = datetime.now().strftime("%H:%M:%S")
         
         return True
@@ -179,15 +490,177 @@ def connect_mqtt():
         return False
 
 def disconnect_mqtt():
-    """Disconnect from MQTT broker"""
-    if st.session_state.mqtt_client:
-        try:
-            st.session_state.mqtt_client.disconnect()
-        except:
-            pass
+    """Disconnect this session; the shared client stops with its last session"""
+    if st.session_state.mqtt_inbox:
+        get_mqtt_hub().detach(st.session_state.mqtt_inbox)
     st.session_state.mqtt_connected = False
     st.session_state.connection_status = "❌ TIDAK TERKONEKSI"
-    st.session_state.mqtt_client = None
+    st.session_state.mqtt_inbox = None
+    st.session_state.data_flowing = False
+
+def process_inbox():
+    """Apply data received by the MQTT thread; returns True if a full rerun is needed"""
+    inbox = st.session_state.mqtt_inbox
+    if inbox is None:
+        return False
+    
+    rows, status = inbox.drain()
+    
+    if status is not None:
+        connected, connection_status, error = status
+        st.session_state.mqtt_connected = connected
+        st.session_state.connection_status = connection_status
+        if error is not None:
+            st.session_state.connection_error = error
+    
+    if rows:
+        st.session_state.logs.extend(rows)
+        st.session_state.last_data = rows[-1]
+        st.session_state.data_version += len(rows)
+        st.session_state.last_row_time = time.monotonic()
+    
+    # Perpindahan mengalir <-> idle mengganti interval fragment live
+    flowing = time.monotonic() - st.session_state.last_row_time < LIVE_IDLE_AFTER
+    if flowing != st.session_state.data_flowing:
+        st.session_state.data_flowing = flowing
+        return True
+    
+    return status is not None
+
+# ==================== FUNGSI UTILITAS ====================
+def session_memo(name, key, compute):
+    """Return compute() memoised in st.session_state[name] until key changes"""
+    # Memo per sesi: cache_data global hanya akan berisi satu entri per sesi
+    memo = st.session_state[name]
+    if memo is None or memo[0] != key:
+        memo = st.session_state[name] = (key, compute())
+    return memo[1]
+
+def calculate_statistics(logs):
+    """Calculate statistics from the log ring buffer"""
+    n = len(logs)
+    if not n:
+        return {
+            "avg_intensity": 0,
+            "avg_voltage": 0,
+            "lamp_on_percentage": 0,
+            "total_data": 0,
+            "latest_timestamp": "N/A"
+        }
+    
+    # Urutan ring buffer tidak berpengaruh untuk agregat, cukup [:n]
+    intensity = logs.intensity[:n]
+    voltage = logs.voltage[:n]
+    
+    # Basic stats
+    avg_intensity = float(np.nanmean(intensity)) if not np.isnan(intensity).all() else 0
+    avg_voltage = float(np.nanmean(voltage)) if not np.isnan(voltage).all() else 0
+    
+    # Lamp on percentage
+    lamp_on_percentage = float((logs.lamp[:n] == LAMP_ON_CODE).mean()) * 100
+    
+    # Latest timestamp
+    latest_timestamp = np.datetime_as_string(logs.timestamp[:n].max(), unit="s")[11:19]
+    
+    return {
+        "avg_intensity": round(avg_intensity, 1),
+        "avg_voltage": round(avg_voltage, 1),
+        "lamp_on_percentage": round(lamp_on_percentage, 1),
+        "total_data": n,
+        "latest_timestamp": latest_timestamp
+    }
+
+def create_trend_figure():
+    """Create the intensity trend figure with an empty WebGL trace"""
+    fig = go.Figure()
+    
+    fig.add_trace(go.Scattergl(
+        x=[],
+        y=[],
+        mode="lines+markers",
+        name="Intensitas Cahaya",
+        line=dict(color="#FFA500", width=3),
+        marker=dict(size=8)
+    ))
+    
+    # Add threshold line
+    fig.add_hline(
+        y=50,
+        line_dash="dash",
+        line_color="red",
+        annotation_text="Threshold (50%)",
+        annotation_position="bottom right"
+    )
+    
+    fig.update_layout(
+        title="TREN INTENSITAS CAHAYA",
+        height=400,
+        xaxis_title="Waktu",
+        yaxis_title="Intensitas (%)",
+        hovermode="x unified",
+        showlegend=True
+    )
+    return fig
+
+def create_intensity_gauge():
+    """Create gauge chart for light intensity; the value is set by the caller"""
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=0,
+        title={"text": "INTENSITAS CAHAYA", "font": {"size": 16}},
+        domain={"x": [0, 1], "y": [0, 1]},
+        gauge={
+            "axis": {"range": [0, 100]},
+            "bar": {"color": "#FFA500"},
+            "steps": [
+                {"range": [0, 30], "color": "#4CAF50", "name": "Gelap"},
+                {"range": [30, 70], "color": "#FFC107", "name": "Sedang"},
+                {"range": [70, 100], "color": "#2196F3", "name": "Terang"}
+            ],
+            "threshold": {
+                "line": {"color": "red", "width": 4},
+                "thickness": 0.75,
+                "value": 50
+            }
+        }
+    ))
+    
+    fig.update_layout(height=250, margin=dict(t=50, b=50, l=50, r=50))
+    return fig
+
+def format_history(logs, count):
+    """Format the last log rows for the history table"""
+    tail = logs.tail(count)
+    df_display = pd.DataFrame({
+        "timestamp": tail["timestamp"],
+        "intensity": tail["intensity"],
+        "voltage": tail["voltage"],
+        "relay_state": RELAY_LABELS[tail["relay"]],
+        "lamp_state": LAMP_LABELS[tail["lamp"]]
+    })
+    
+    # Format for display
+    df_display["waktu"] = pd.to_datetime(df_display["timestamp"], errors="coerce").dt.strftime("%H:%M:%S")
+    
+    display_cols = ["waktu", "intensity", "voltage", "relay_state", "lamp_state"]
+    display_df = df_display[display_cols].copy()
+    
+    # Format values (float64 + "%.1f" agar sama dengan f"{x:.1f}" per baris)
+    intensity = display_df["intensity"].to_numpy(dtype=np.float64)
+    voltage = display_df["voltage"].to_numpy(dtype=np.float64)
+    display_df["intensity"] = np.where(np.isnan(intensity), "N/A", np.char.add(np.char.mod("%.1f", intensity), "%"))
+    display_df["voltage"] = np.where(np.isnan(voltage), "N/A", np.char.add(np.char.mod("%.1f", voltage), "V"))
+    
+    display_df.columns = ["Waktu", "Intensitas", "Tegangan", "Relay", "Lampu"]
+    return display_df
+
+def history_csv(display_df):
+    """Encode the history table as CSV bytes"""
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(display_df.columns)
+    writer.writerows(display_df.itertuples(index=False))
+    return buf.getvalue().encode('utf-8')
 
 # ==================== STREAMLIT UI ====================
 st.set_page_config(
@@ -196,8 +669,15 @@ st.set_page_config(
     layout="wide"
 )
 
+# CSS Styling (fragment live_dashboard tidak mengeksekusi ulang bagian ini)
+st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+
 st.title("💡 SMART STREETLIGHT MONITORING SYSTEM")
 
+# Ambil data MQTT sekali di awal full rerun agar sidebar dan dashboard konsisten;
+# panggilan di live_dashboard() pada run yang sama tidak menemukan data baru
+process_inbox()
+
 # ==================== SIDEBAR ====================
 with st.sidebar:
     st.title("⚙️ KONTROL KONEKSI")
@@ -258,8 +738,9 @@ with st.sidebar:
     st.subheader("📊 KONTROL DATA")
     
     if st.button("🗑️ Reset Data", use_container_width=True):
-        st.session_state.logs = []
+        st.session_state.logs = LogBuffer()
         st.session_state.last_data = None
+        st.session_state.data_version = 0
         st.success("Data telah direset")
         st.rerun()
     
@@ -298,72 +779,75 @@ const char* topic = "{MQTT_TOPIC_SENSOR}";
            - Subscribe to: iot/streetlight
         """)
 
-# ==================== MQTT LOOP POLLING ====================
-# Process MQTT messages if connected
-if st.session_state.mqtt_client:
-    try:
-        st.session_state.mqtt_client.loop(timeout=0.1)
-    except Exception as e:
-        print(f"MQTT loop error: {e}")
-
-# ==================== MAIN DASHBOARD ====================
-# Status Banner
-if not st.session_state.mqtt_connected:
-    st.error("""
-    ⚠️ **MQTT TIDAK TERKONEKSI!** 
-    
-    Silakan klik tombol "Sambungkan ke MQTT" di sidebar untuk menghubungkan ke broker.
-    
-    **Pastikan:**
-    1. ESP32 menyala dan terhubung ke WiFi
-    2. ESP32 mengirim data ke topic: `iot/streetlight`
-    3. Format data: `{timestamp;intensity;voltage}`
-    """)
-else:
-    if st.session_state.last_data:
-        st.success(f"✅ **TERHUBUNG KE MQTT BROKER** - Data terakhir: {st.session_state.last_data.get('timestamp').strftime('%H:%M:%S')}")
+# ==================== LIVE DASHBOARD ====================
+# Interval dievaluasi ulang setiap full rerun, dan perpindahan mengalir/idle
+# selalu memicu full rerun, jadi interval mengikuti aliran data
+@st.fragment(run_every=LIVE_REFRESH_FLOWING if st.session_state.data_flowing else LIVE_REFRESH_IDLE)
+def live_dashboard():
+    """Render the live section of the dashboard; reruns without the sidebar"""
+    # Status koneksi tampil di sidebar dan interval fragment hanya dibaca saat
+    # rerun penuh, jadi perubahan status atau aliran data butuh rerun penuh
+    if process_inbox():
+        st.rerun()
+    
+    # ==================== MAIN DASHBOARD ====================
+    # Status Banner
+    if not st.session_state.mqtt_connected:
+        st.error("""
+        ⚠️ **MQTT TIDAK TERKONEKSI!** 
+        
+        Silakan klik tombol "Sambungkan ke MQTT" di sidebar untuk menghubungkan ke broker.
+        
+        **Pastikan:**
+        1. ESP32 menyala dan terhubung ke WiFi
+        2. ESP32 mengirim data ke topic: `iot/streetlight`
+        3. Format data: `{timestamp;intensity;voltage}`
+        """)
     else:
-        st.success("✅ **TERHUBUNG KE MQTT BROKER** - Menunggu data dari ESP32...")
-
-# ==================== METRICS CARDS ====================
-st.header("📊 STATUS REAL-TIME")
-
-if st.session_state.last_data:
-    data = st.session_state.last_data
-    
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        intensity = data.get("intensity")
-        if intensity is not None:
-            # Determine status based on intensity
-            if intensity < 30:
-                color = "🟢"
-                status_text = "GELAP"
-                status_color = "normal"
-                intensity_desc = "Lampu MENYALA"
-            elif intensity < 70:
-                color = "🟡"
-                status_text = "SEDANG"
-                status_color = "off"
-                intensity_desc = "Kondisi Normal"
-            else:
-                color = "🔵"
-                status_text = "TERANG"
-                status_color = "inverse"
-                intensity_desc = "Lampu MATI"
-            
-            st.metric(
-                label=f"{color} Intensitas Cahaya",
-                value=f"{intensity:.1f}%",
-                delta=f"{status_text}",
-                delta_color=status_color,
-                help=intensity_desc
-            )
+        if st.session_state.last_data:
+            st.success(f"✅ **TERHUBUNG KE MQTT BROKER** - Data terakhir: {st.session_state.last_data['_time_str']}")
         else:
-            st.metric("Intensitas Cahaya", "N/A")
-    
-    with col2:
+            st.success("✅ **TERHUBUNG KE MQTT BROKER** - Menunggu data dari ESP32...")
+
+    # ==================== METRICS CARDS ====================
+    st.header("📊 STATUS REAL-TIME")
+
+    if st.session_state.last_data:
+        data = st.session_state.last_data
+        
+        col1, cards_col = st.columns([1, 3])
+        
+        with col1:
+            intensity = data.get("intensity")
+            if intensity is not None:
+                # Determine status based on intensity
+                if intensity < 30:
+                    color = "🟢"
+                    status_text = "GELAP"
+                    status_color = "normal"
+                    intensity_desc = "Lampu MENYALA"
+                elif intensity < 70:
+                    color = "🟡"
+                    status_text = "SEDANG"
+                    status_color = "off"
+                    intensity_desc = "Kondisi Normal"
+                else:
+                    color = "🔵"
+                    status_text = "TERANG"
+                    status_color = "inverse"
+                    intensity_desc = "Lampu MATI"
+                
+                st.metric(
+                    label=f"{color} Intensitas Cahaya",
+                    value=f"{intensity:.1f}%",
+                    delta=f"{status_text}",
+                    delta_color=status_color,
+                    help=intensity_desc
+                )
+            else:
+                st.metric("Intensitas Cahaya", "N/A")
+        
+        # Relay card
         voltage = data.get("voltage")
         relay_state = data.get("relay_state", "UNKNOWN")
         
@@ -380,16 +864,15 @@ if st.session_state.last_data:
             bg_color = "#6c757d"
             status_desc = "Status tidak diketahui"
         
-        st.markdown(f"""
-        <div style="background-color: {bg_color}; padding: 15px; border-radius: 10px; color: white; text-align: center;">
-            <div style="font-size: 14px; opacity: 0.9;">{icon} Status Relay</div>
-            <div style="font-size: 24px; font-weight: bold; margin: 5px 0;">{relay_state}</div>
-            <div style="font-size: 16px;">{voltage if voltage is not None else 'N/A'} V</div>
-        </div>
-        """, unsafe_allow_html=True)
-        st.caption(status_desc)
-    
-    with col3:
+        relay_html = RELAY_CARD_TMPL.format(
+            bg_color=bg_color,
+            icon=icon,
+            relay_state=relay_state,
+            voltage=voltage if voltage is not None else 'N/A',
+            caption=status_desc
+        )
+        
+        # Lamp card
         lamp_state = data.get("lamp_state", "UNKNOWN")
         
         if lamp_state == "MENYALA":
@@ -408,289 +891,158 @@ if st.session_state.last_data:
             text_color = "white"
             lamp_desc = "Status tidak diketahui"
         
-        st.markdown(f"""
-        <div style="background-color: {bg_color}; padding: 15px; border-radius: 10px; color: {text_color}; text-align: center;">
-            <div style="font-size: 14px; opacity: 0.9;">Status Lampu</div>
-            <div style="font-size: 36px; margin: 10px 0;">{icon}</div>
-            <div style="font-size: 20px; font-weight: bold;">{lamp_state}</div>
-        </div>
-        """, unsafe_allow_html=True)
-        st.caption(lamp_desc)
-    
-    with col4:
-        timestamp = data.get("timestamp")
-        if isinstance(timestamp, datetime):
-            time_str = timestamp.strftime("%H:%M:%S")
-            date_str = timestamp.strftime("%Y-%m-%d")
-        else:
-            time_str = "N/A"
-            date_str = "N/A"
+        lamp_html = LAMP_CARD_TMPL.format(
+            bg_color=bg_color,
+            text_color=text_color,
+            icon=icon,
+            lamp_state=lamp_state,
+            caption=lamp_desc
+        )
         
-        data_count = len(st.session_state.logs)
+        # Info card
+        info_html = INFO_CARD_TMPL.format(
+            time_str=data.get("_time_str", "N/A"),
+            date_str=data.get("_date_str", "N/A"),
+            data_count=len(st.session_state.logs)
+        )
         
-        st.markdown(f"""
-        <div style="background-color: #0d6efd; padding: 15px; border-radius: 10px; color: white; text-align: center;">
-            <div style="font-size: 14px; opacity: 0.9;">📊 Info Sistem</div>
-            <div style="font-size: 20px; font-weight: bold; margin: 5px 0;">{time_str}</div>
-            <div style="font-size: 12px;">{date_str}</div>
-            <div style="font-size: 12px; margin-top: 5px;">Data: {data_count} records</div>
-        </div>
-        """, unsafe_allow_html=True)
-        st.caption("Update terakhir")
-else:
-    st.info("📭 **Belum ada data** - Tunggu data dari ESP32 atau sambungkan ke MQTT terlebih dahulu")
-
-# ==================== FUNGSI UTILITAS ====================
-def calculate_statistics():
-    """Calculate statistics from logs"""
-    if not st.session_state.logs:
-        return {
-            "avg_intensity": 0,
-            "avg_voltage": 0,
-            "lamp_on_percentage": 0,
-            "total_data": 0,
-            "latest_timestamp": "N/A"
-        }
-    
-    df = pd.DataFrame(st.session_state.logs)
-    
-    if df.empty:
-        return {
-            "avg_intensity": 0,
-            "avg_voltage": 0,
-            "lamp_on_percentage": 0,
-            "total_data": 0,
-            "latest_timestamp": "N/A"
-        }
-    
-    # Basic stats
-    avg_intensity = df["intensity"].mean() if "intensity" in df.columns and not df["intensity"].isna().all() else 0
-    avg_voltage = df["voltage"].mean() if "voltage" in df.columns and not df["voltage"].isna().all() else 0
-    
-    # Lamp on percentage
-    if "lamp_state" in df.columns:
-        lamp_on_count = (df["lamp_state"] == "MENYALA").sum()
-        lamp_on_percentage = (lamp_on_count / len(df)) * 100 if len(df) > 0 else 0
+        with cards_col:
+            cards = "\n".join([relay_html, lamp_html, info_html])
+            st.markdown(CARDS_ROW_TMPL.format(cards=cards), unsafe_allow_html=True)
     else:
-        lamp_on_percentage = 0
-    
-    # Latest timestamp
-    if "timestamp" in df.columns:
-        latest_timestamp = df["timestamp"].max()
-        if isinstance(latest_timestamp, datetime):
-            latest_timestamp = latest_timestamp.strftime("%H:%M:%S")
-        else:
-            latest_timestamp = "N/A"
-    else:
-        latest_timestamp = "N/A"
-    
-    return {
-        "avg_intensity": round(avg_intensity, 1),
-        "avg_voltage": round(avg_voltage, 1),
-        "lamp_on_percentage": round(lamp_on_percentage, 1),
-        "total_data": len(df),
-        "latest_timestamp": latest_timestamp
-    }
-
-def create_intensity_gauge(value):
-    """Create gauge chart for light intensity"""
-    fig = go.Figure(go.Indicator(
-        mode="gauge+number",
-        value=value,
-        title={"text": "INTENSITAS CAHAYA", "font": {"size": 16}},
-        domain={"x": [0, 1], "y": [0, 1]},
-        gauge={
-            "axis": {"range": [0, 100]},
-            "bar": {"color": "#FFA500"},
-            "steps": [
-                {"range": [0, 30], "color": "#4CAF50", "name": "Gelap"},
-                {"range": [30, 70], "color": "#FFC107", "name": "Sedang"},
-                {"range": [70, 100], "color": "#2196F3", "name": "Terang"}
-            ],
-            "threshold": {
-                "line": {"color": "red", "width": 4},
-                "thickness": 0.75,
-                "value": 50
-            }
-        }
-    ))
-    
-    fig.update_layout(height=250, margin=dict(t=50, b=50, l=50, r=50))
-    return fig
+        st.info("📭 **Belum ada data** - Tunggu data dari ESP32 atau sambungkan ke MQTT terlebih dahulu")
 
-# ==================== VISUALISASI DATA ====================
-st.header("📈 VISUALISASI DATA")
+    # ==================== VISUALISASI DATA ====================
+    st.header("📈 VISUALISASI DATA")
 
-if st.session_state.logs:
-    logs_list = st.session_state.logs[-200:]  # Last 200 points
-    df = pd.DataFrame(logs_list)
-    
-    if not df.empty and "intensity" in df.columns:
-        col1, col2 = st.columns([2, 1])
+    if st.session_state.logs:
+        # Array NumPy langsung dari ring buffer, tanpa DataFrame
+        points = st.session_state.logs.tail(200)  # Last 200 points
         
-        with col1:
-            # Line chart
-            fig = go.Figure()
-            
-            fig.add_trace(go.Scatter(
-                x=df["timestamp"],
-                y=df["intensity"],
-                mode="lines+markers",
-                name="Intensitas Cahaya",
-                line=dict(color="#FFA500", width=3),
-                marker=dict(size=8)
-            ))
-            
-            # Add threshold line
-            fig.add_hline(
-                y=50,
-                line_dash="dash",
-                line_color="red",
-                annotation_text="Threshold (50%)",
-                annotation_position="bottom right"
-            )
-            
-            # Color markers by lamp state if available
-            if "lamp_state" in df.columns:
-                colors = df["lamp_state"].apply(lambda x: "#FFD700" if x == "MENYALA" else "#2E4053")
-                fig.update_traces(marker=dict(color=colors))
-            
-            fig.update_layout(
-                title="TREN INTENSITAS CAHAYA",
-                height=400,
-                xaxis_title="Waktu",
-                yaxis_title="Intensitas (%)",
-                hovermode="x unified",
-                showlegend=True
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
-        
-        with col2:
-            # Gauge chart
-            if st.session_state.last_data:
-                intensity = st.session_state.last_data.get("intensity", 50)
-                st.plotly_chart(create_intensity_gauge(intensity), use_container_width=True)
+        if points["intensity"].size:
+            col1, col2 = st.columns([2, 1])
             
-            # Statistics
-            stats = calculate_statistics()
+            with col1:
+                # Color markers by lamp state
+                colors = np.where(points["lamp"] == LAMP_ON_CODE, "#FFD700", "#2E4053")
+                
+                # Line chart (WebGL); layout dibuat sekali, hanya array yang diganti
+                fig = st.session_state.trend_fig
+                if fig is None:
+                    fig = st.session_state.trend_fig = create_trend_figure()
+                
+                trace = fig.data[0]
+                trace.x = points["timestamp"]
+                trace.y = points["intensity"]
+                trace.marker.color = colors
+                
+                st.plotly_chart(fig, use_container_width=True)
             
-            st.metric("📊 Rata-rata Intensitas", f"{stats['avg_intensity']}%")
-            st.metric("💡 Lampu Menyala", f"{stats['lamp_on_percentage']}%")
-            st.metric("⚡ Tegangan Rata-rata", f"{stats['avg_voltage']}V")
-            st.metric("📈 Total Data", f"{stats['total_data']}")
+            with col2:
+                # Gauge chart
+                if st.session_state.last_data:
+                    intensity = st.session_state.last_data.get("intensity", 50)
+                    
+                    # Template gauge dibuat sekali per sesi, hanya value yang diganti
+                    gauge_fig = st.session_state.gauge_fig
+                    if gauge_fig is None:
+                        gauge_fig = st.session_state.gauge_fig = create_intensity_gauge()
+                    gauge_fig.data[0].value = intensity
+                    
+                    st.plotly_chart(gauge_fig, use_container_width=True, key="gauge")
+                
+                # Statistics (dihitung ulang hanya bila ada data baru)
+                logs = st.session_state.logs
+                stats = session_memo(
+                    "stats_memo",
+                    (logs.token, st.session_state.data_version),
+                    lambda: calculate_statistics(logs)
+                )
+                
+                st.metric("📊 Rata-rata Intensitas", f"{stats['avg_intensity']}%")
+                st.metric("💡 Lampu Menyala", f"{stats['lamp_on_percentage']}%")
+                st.metric("⚡ Tegangan Rata-rata", f"{stats['avg_voltage']}V")
+                st.metric("📈 Total Data", f"{stats['total_data']}")
+        else:
+            st.warning("Data tidak lengkap untuk visualisasi")
     else:
-        st.warning("Data tidak lengkap untuk visualisasi")
-else:
-    st.info("📭 **Belum ada data untuk divisualisasikan**")
+        st.info("📭 **Belum ada data untuk divisualisasikan**")
 
-# ==================== DATA HISTORIS ====================
-st.header("📋 DATA HISTORIS")
+    # ==================== DATA HISTORIS ====================
+    st.header("📋 DATA HISTORIS")
 
-if st.session_state.logs:
-    logs_list = st.session_state.logs[-50:]  # Last 50 records
-    df_display = pd.DataFrame(logs_list)
-    
-    if not df_display.empty:
-        # Format for display
-        df_display["waktu"] = df_display["timestamp"].apply(
-            lambda x: x.strftime("%H:%M:%S") if isinstance(x, datetime) else str(x)[11:19]
-        )
-        
-        display_cols = ["waktu", "intensity", "voltage", "relay_state", "lamp_state"]
-        display_df = df_display[display_cols].copy()
-        
-        # Format values
-        display_df["intensity"] = display_df["intensity"].apply(lambda x: f"{x:.1f}%" if pd.notnull(x) else "N/A")
-        display_df["voltage"] = display_df["voltage"].apply(lambda x: f"{x:.1f}V" if pd.notnull(x) else "N/A")
-        
-        display_df.columns = ["Waktu", "Intensitas", "Tegangan", "Relay", "Lampu"]
-        
-        st.dataframe(
-            display_df,
-            hide_index=True,
-            use_container_width=True,
-            height=300
+    if st.session_state.logs:
+        # Formatting hanya diulang bila ada data baru
+        logs = st.session_state.logs
+        display_df = session_memo(
+            "history_memo",
+            (logs.token, st.session_state.data_version),
+            lambda: format_history(logs, 50)  # Last 50 records
         )
         
-        # Download button
-        csv = display_df.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="📥 Download Data CSV",
-            data=csv,
-            file_name=f"streetlight_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-            mime="text/csv",
-            use_container_width=True
-        )
-else:
-    st.info("📭 Tidak ada data historis")
+        if not display_df.empty:
+            st.dataframe(
+                display_df,
+                hide_index=True,
+                use_container_width=True,
+                height=300
+            )
+            
+            # Download button
+            csv_data = session_memo(
+                "csv_memo",
+                (logs.token, st.session_state.data_version),
+                lambda: history_csv(display_df)
+            )
+            st.download_button(
+                label="📥 Download Data CSV",
+                data=csv_data,
+                file_name=f"streetlight_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                mime="text/csv",
+                use_container_width=True
+            )
+    else:
+        st.info("📭 Tidak ada data historis")
 
-# ==================== DIAGNOSTIC PANEL ====================
-with st.expander("🔍 PANEL DIAGNOSTIK", expanded=False):
-    diag_col1, diag_col2 = st.columns(2)
-    
-    with diag_col1:
-        st.subheader("🔄 Status Sistem")
-        st.write(f"**Koneksi MQTT:** {'✅ Terhubung' if st.session_state.mqtt_connected else '❌ Terputus'}")
-        st.write(f"**Status:** {st.session_state.connection_status}")
-        st.write(f"**Client MQTT:** {'✅ Ada' if st.session_state.mqtt_client else '❌ Tidak ada'}")
-        st.write(f"**Total data:** {len(st.session_state.logs)}")
-        st.write(f"**Data terakhir:** {st.session_state.last_connection_attempt}")
+    # ==================== DIAGNOSTIC PANEL ====================
+    with st.expander("🔍 PANEL DIAGNOSTIK", expanded=False):
+        diag_col1, diag_col2 = st.columns(2)
         
-        if st.button("🩺 Refresh Diagnostics", key="refresh_diag"):
-            st.rerun()
-    
-    with diag_col2:
-        st.subheader("🌐 Network Test")
-        if st.button("Test Broker Connection", use_container_width=True, key="test_broker_diag"):
-            with st.spinner("Testing broker.hivemq.com..."):
-                success, error = test_broker_connection()
-                if success:
-                    st.success("✅ Broker dapat diakses dari server ini")
-                else:
-                    st.error(f"❌ Broker tidak dapat diakses: {error}")
+        with diag_col1:
+            st.subheader("🔄 Status Sistem")
+            st.write(f"**Koneksi MQTT:** {'✅ Terhubung' if st.session_state.mqtt_connected else '❌ Terputus'}")
+            st.write(f"**Status:** {st.session_state.connection_status}")
+            st.write(f"**Sesi terdaftar di client MQTT:** {'✅ Ya' if st.session_state.mqtt_inbox is not None else '❌ Tidak'}")
+            st.write(f"**Client MQTT bersama:** {'✅ Berjalan' if get_mqtt_hub().client else '❌ Tidak berjalan'}")
+            st.write(f"**Total data:** {len(st.session_state.logs)}")
+            st.write(f"**Data terakhir:** {st.session_state.last_connection_attempt}")
+            
+            if st.button("🩺 Refresh Diagnostics", key="refresh_diag"):
+                st.rerun()
+        
+        with diag_col2:
+            st.subheader("🌐 Network Test")
+            if st.button("Test Broker Connection", use_container_width=True, key="test_broker_diag"):
+                with st.spinner("Testing broker.hivemq.com..."):
+                    success, error = test_broker_connection()
+                    if success:
+                        st.success("✅ Broker dapat diakses dari server ini")
+                    else:
+                        st.error(f"❌ Broker tidak dapat diakses: {error}")
 
-# ==================== FOOTER ====================
-st.divider()
+    # ==================== FOOTER ====================
+    st.divider()
 
-footer_col1, footer_col2 = st.columns([1, 3])
+    footer_col1, footer_col2 = st.columns([1, 3])
 
-with footer_col2:
-    status_icon = "🟢" if st.session_state.mqtt_connected else "🔴"
-    
-    st.markdown(f"""
-    <div style="text-align: right; color: #666; font-size: 12px; padding: 10px;">
-        <p>💡 <strong>Smart Streetlight Dashboard</strong> | 
-        Status: {status_icon} {st.session_state.connection_status} | 
-        Data: {len(st.session_state.logs)} records | 
-        Update: {datetime.now().strftime('%H:%M:%S')}</p>
-    </div>
-    """, unsafe_allow_html=True)
-
-# CSS Styling
-st.markdown("""
-<style>
-    /* Custom styling */
-    div[data-testid="stMetricValue"] {
-        font-size: 24px;
-        font-weight: bold;
-    }
-    
-    div[data-testid="stMetricDelta"] {
-        font-size: 14px;
-    }
-    
-    .stButton button {
-        transition: all 0.3s ease;
-    }
-    
-    .stButton button:hover {
-        transform: translateY(-1px);
-        box-shadow: 0 3px 6px rgba(0,0,0,0.1);
-    }
-</style>
-""", unsafe_allow_html=True)
+    with footer_col2:
+        status_icon = "🟢" if st.session_state.mqtt_connected else "🔴"
+        
+        st.markdown(FOOTER_TMPL.format(
+            status_icon=status_icon,
+            connection_status=st.session_state.connection_status,
+            data_count=len(st.session_state.logs),
+            update_time=datetime.now().strftime('%H:%M:%S')
+        ), unsafe_allow_html=True)
 
-# Auto-refresh
-time.sleep(2)
-st.rerun()
+live_dashboard()